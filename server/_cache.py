@@ -0,0 +1,125 @@
+"""
+Response cache for the Grok API MCP server.
+
+Parsed API responses are cached under a SHA-256 of the request payload, so an
+identical request (same model, input, tools, and conversation) skips the API.
+The default backend is an in-process LRU with per-entry TTL; RedisBackend
+shares the cache between server processes.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import orjson
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Redis-backed cache shared across processes (requires the `redis` extra).
+
+    Values are stored as JSON; `decode` rebuilds the cached object from the
+    decoded JSON on the way out.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = "grok:response:",
+        decode: Optional[Callable[[Any], Any]] = None,
+    ):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._errors = redis.RedisError
+        self.prefix = prefix
+        self.decode = decode
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self.prefix + key)
+        except self._errors:
+            # An unreachable cache is a miss, not a failed request
+            return None
+        if raw is None:
+            return None
+        try:
+            value = orjson.loads(raw)
+            return self.decode(value) if self.decode is not None else value
+        except (orjson.JSONDecodeError, TypeError):
+            # Entries this server can't read (corrupt, or written by another
+            # version) are a miss as well
+            return None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            await self._redis.set(self.prefix + key, orjson.dumps(value), ex=ttl)
+        except self._errors:
+            pass
+
+    async def clear(self) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self._redis.delete(*keys)
+
+
+class LLMCache:
+    """Response cache with a pluggable backend. A TTL of 0 disables caching."""
+
+    def __init__(self, backend=None, ttl: int = 0):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        """Hash a request payload into a stable cache key."""
+        normalized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(normalized).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return await self.backend.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        await self.backend.set(key, value, ttl if ttl is not None else self.ttl)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
@@ -0,0 +1,90 @@
+"""
+Semantic response cache for the Grok API MCP server.
+
+Catches paraphrased repeats ("What's the weather in SF?" vs "SF weather?") that
+the exact-match cache misses: each query is embedded once and compared by
+cosine similarity against earlier queries sent with the same model, system
+instruction, and tools. Entries expire after a TTL, like the exact-match
+cache. Requires the `semantic` extra (fastembed + numpy).
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def fastembed_embedder(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Callable[[str], np.ndarray]:
+    """Return an embed function backed by a lazily loaded fastembed ONNX model."""
+    model = None
+    lock = threading.Lock()
+
+    def embed(text: str) -> np.ndarray:
+        nonlocal model
+        with lock:
+            if model is None:
+                from fastembed import TextEmbedding
+
+                model = TextEmbedding(model_name)
+        return next(iter(model.embed([text])))
+
+    return embed
+
+
+class SemanticCache:
+    """Bounded LRU of (query embedding, parsed response) pairs with per-entry expiry."""
+
+    def __init__(
+        self,
+        embed: Callable[[str], Any],
+        threshold: float = 0.92,
+        max_size: int = 512,
+        ttl: int = 3600,
+    ):
+        self._embed = embed
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, np.ndarray, Any]] = OrderedDict()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize a query off the event loop."""
+        vector = np.asarray(await asyncio.to_thread(self._embed, text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(self, namespace: str, vector: np.ndarray) -> Optional[Any]:
+        """Return the cached value most similar to `vector`, if above threshold."""
+        now = time.monotonic()
+        keys = []
+        for key, (expires_at, _, _) in list(self._entries.items()):
+            if expires_at <= now:
+                del self._entries[key]
+            elif key[0] == namespace:
+                keys.append(key)
+        if not keys:
+            return None
+
+        matrix = np.stack([self._entries[key][1] for key in keys])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+
+        self._entries.move_to_end(keys[best])
+        return self._entries[keys[best]][2]
+
+    def add(self, namespace: str, text: str, vector: np.ndarray, value: Any) -> None:
+        key = (namespace, text)
+        self._entries[key] = (time.monotonic() + self.ttl, vector, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -8,35 +8,195 @@ Features:
 - X (Twitter) search grounding via Grok's x_search tool
 - Prompt-based thinking for thorough analysis
 - Stateful conversations via response_id
+- Optional response cache (in-process or Redis)
 """
 
+import asyncio
+import functools
+import logging
 import os
-from typing import Optional
-from fastmcp import FastMCP
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, NamedTuple, Optional
+from fastmcp import Context, FastMCP
 import httpx
+import ijson
+from aiolimiter import AsyncLimiter
+import orjson
+import tenacity
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from _cache import LLMCache, MemoryBackend, RedisBackend
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield {}
+    finally:
+        if _http_client.cache_info().currsize:
+            await _http_client().aclose()
+            _http_client.cache_clear()
+
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastMCP server
-mcp = FastMCP("Grok Research")
-
-# Get API key from environment
-XAI_API_KEY = os.getenv("XAI_API_KEY")
-if not XAI_API_KEY:
-    raise ValueError(
-        "XAI_API_KEY environment variable is required. "
-        "Get your API key from https://console.x.ai/"
-    )
+mcp = FastMCP("Grok Research", lifespan=_lifespan)
 
 # API configuration
 API_ENDPOINT = "https://api.x.ai/v1/responses"
 MODEL = "grok-4-1-fast-non-reasoning"
 REASONING_MODEL = "grok-4-1-fast"
 
+# Default tool definitions, shared by every request that needs no per-call
+# options. Never mutate these; copy them when adding options.
+_WEB_SEARCH_TOOL = {"type": "web_search"}
+_X_SEARCH_TOOL = {"type": "x_search"}
+
+# The API accepts at most this many allowed/excluded X handles
+MAX_X_HANDLES = 10
+
+# Bodies larger than this are stream-parsed instead of decoded in one go
+STREAM_PARSE_THRESHOLD = 1024 * 1024
+
+# Retry policy for rate limits (429), transient server errors and read timeouts
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 4
+MAX_RETRY_AFTER = 60.0
+
+# Default number of batch queries in flight at once
+MAX_BATCH_CONCURRENCY = 10
+
+
+class Settings(NamedTuple):
+    """Server configuration, read from the environment (and .env) on first use."""
+
+    api_key: str
+    endpoint: str = API_ENDPOINT
+    model: str = MODEL
+    reasoning_model: str = REASONING_MODEL
+    # Response cache: cache_ttl (seconds) > 0 enables it, cache_url points it
+    # at Redis instead of process memory.
+    cache_ttl: int = 0
+    cache_url: Optional[str] = None
+    # Semantic cache for paraphrased queries (cosine similarity, e.g. 0.92).
+    # Needs the `semantic` extra; entries share cache_ttl, so 0 disables it too.
+    semantic_cache_threshold: Optional[float] = None
+    # Client-side cap on requests per minute across all tools, so batch
+    # fan-out stays under the account's API limit. 0 means no cap.
+    max_rpm: int = 0
+
+
+@functools.lru_cache(maxsize=1)
+def _settings() -> Settings:
+    """Load settings once, deferring the .env lookup until the first tool call."""
+    load_dotenv()
+
+    api_key = os.getenv("XAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "XAI_API_KEY environment variable is required. "
+            "Get your API key from https://console.x.ai/"
+        )
+
+    semantic_cache_threshold = os.getenv("GROK_SEMANTIC_CACHE_THRESHOLD")
+    return Settings(
+        api_key=api_key,
+        cache_ttl=_env_number("GROK_CACHE_TTL", int),
+        cache_url=os.getenv("GROK_CACHE_URL") or None,
+        semantic_cache_threshold=(
+            _env_number("GROK_SEMANTIC_CACHE_THRESHOLD", float) if semantic_cache_threshold else None
+        ),
+        max_rpm=_env_number("GROK_MAX_RPM", int),
+    )
+
+
+def _env_number(name: str, parse: Callable[[str], int | float]) -> int | float:
+    """Read a numeric setting (default 0), naming the variable if it is malformed."""
+    value = os.getenv(name) or "0"
+    try:
+        return parse(value)
+    except ValueError:
+        kind = "a whole number" if parse is int else "a number"
+        raise ValueError(f"{name} must be {kind}, got {value!r}") from None
+
+
+@functools.lru_cache(maxsize=1)
+def _http_client() -> httpx.AsyncClient:
+    """
+    Shared HTTP client: every request goes to the same host, so keep
+    connections alive across tool calls instead of paying a TCP+TLS handshake
+    each time. It is async so concurrent tool calls don't block the event loop,
+    and speaks HTTP/2 so concurrent calls share one multiplexed connection.
+    httpx negotiates gzip/brotli response compression on its own.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=120.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        headers={
+            "Authorization": f"Bearer {_settings().api_key}",
+            "Content-Type": "application/json",
+        },
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _response_cache() -> LLMCache:
+    settings = _settings()
+    if settings.cache_url:
+        backend = RedisBackend(settings.cache_url, decode=lambda value: GrokResult(**value))
+    else:
+        backend = MemoryBackend()
+    return LLMCache(backend, ttl=settings.cache_ttl)
+
+
+@functools.lru_cache(maxsize=1)
+def _paraphrase_cache():
+    """The semantic cache, or None when it is not enabled."""
+    settings = _settings()
+    if settings.semantic_cache_threshold is None or settings.cache_ttl <= 0:
+        return None
+
+    from _semantic_cache import SemanticCache, fastembed_embedder
+
+    return SemanticCache(
+        fastembed_embedder(),
+        threshold=settings.semantic_cache_threshold,
+        ttl=settings.cache_ttl,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _rate_limiter() -> Optional[AsyncLimiter]:
+    max_rpm = _settings().max_rpm
+    return AsyncLimiter(max_rpm, 60) if max_rpm > 0 else None
+
 
-def _create_request(
+@dataclass(slots=True)
+class GrokResult:
+    """Parsed Grok API response (or failure) returned by _create_request."""
+
+    response_id: Optional[str]
+    status: str = "completed"
+    text: str = ""
+    sources: list[dict] = field(default_factory=list)
+    usage: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class StreamError(Exception):
+    """A streamed response reported a failure (response.failed or error event)."""
+
+
+def _limit_handles(handles: list[str]) -> list[str]:
+    """Cap an X handle list at MAX_X_HANDLES, copying only when it is too long."""
+    return handles if len(handles) <= MAX_X_HANDLES else handles[:MAX_X_HANDLES]
+
+
+async def _create_request(
     input_content: str | list,
     previous_response_id: Optional[str] = None,
     max_tokens: int = 8192,
@@ -51,12 +211,16 @@ def _create_request(
     to_date: Optional[str] = None,
     enable_image_understanding: bool = False,
     enable_video_understanding: bool = False,
-) -> dict:
+    on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> GrokResult:
     """
     Create a request to the Grok API.
 
     Returns parsed response with text, sources, response_id, and usage.
 
+    If on_delta is given, the response is streamed over SSE and on_delta is
+    awaited with each text delta as it arrives; the parsed result is the same.
+
     X search filter parameters (only apply when use_x_search=True):
         allowed_x_handles: Only include posts from these X handles (max 10)
         excluded_x_handles: Exclude posts from these X handles (max 10)
@@ -65,6 +229,11 @@ def _create_request(
         enable_image_understanding: Allow model to analyze images in posts
         enable_video_understanding: Allow model to analyze videos in posts
     """
+    try:
+        settings = _settings()
+    except ValueError as e:
+        return GrokResult(response_id=None, status="failed", error=f"Configuration error: {e}")
+
     # Build input messages
     messages = []
 
@@ -82,90 +251,311 @@ def _create_request(
     else:
         messages.extend(input_content)
 
-    model = REASONING_MODEL if use_reasoning else MODEL
+    model = settings.reasoning_model if use_reasoning else settings.model
 
     payload = {
         "model": model,
         "input": messages,
         "store": True,  # Enable caching
+        "max_output_tokens": max_tokens,
     }
 
-    # Add max_tokens if supported
-    if max_tokens:
-        payload["max_output_tokens"] = max_tokens
-
-    # Build tools list
-    tools = []
-
-    # Add web search tool
-    if use_web_search:
-        web_search_tool = {"type": "web_search"}
-        if enable_image_understanding:
-            web_search_tool["enable_image_understanding"] = True
-        tools.append(web_search_tool)
-
-    # Add X search tool with optional filters
-    if use_x_search:
-        x_search_tool = {"type": "x_search"}
-
-        if allowed_x_handles:
-            x_search_tool["allowed_x_handles"] = allowed_x_handles[:10]  # Max 10
-        if excluded_x_handles:
-            x_search_tool["excluded_x_handles"] = excluded_x_handles[:10]  # Max 10
-        if from_date:
-            x_search_tool["from_date"] = from_date
-        if to_date:
-            x_search_tool["to_date"] = to_date
-        if enable_image_understanding:
-            x_search_tool["enable_image_understanding"] = True
-        if enable_video_understanding:
-            x_search_tool["enable_video_understanding"] = True
-
-        tools.append(x_search_tool)
-
-    if tools:
+    # Build tools list (chat requests skip this entirely)
+    if use_web_search or use_x_search:
+        tools = []
+
+        # Add web search tool
+        if use_web_search:
+            if enable_image_understanding:
+                tools.append({**_WEB_SEARCH_TOOL, "enable_image_understanding": True})
+            else:
+                tools.append(_WEB_SEARCH_TOOL)
+
+        # Add X search tool with optional filters
+        if use_x_search:
+            x_search_tool = {}
+
+            if allowed_x_handles:
+                x_search_tool["allowed_x_handles"] = _limit_handles(allowed_x_handles)
+            if excluded_x_handles:
+                x_search_tool["excluded_x_handles"] = _limit_handles(excluded_x_handles)
+            if from_date:
+                x_search_tool["from_date"] = from_date
+            if to_date:
+                x_search_tool["to_date"] = to_date
+            if enable_image_understanding:
+                x_search_tool["enable_image_understanding"] = True
+            if enable_video_understanding:
+                x_search_tool["enable_video_understanding"] = True
+
+            tools.append({**_X_SEARCH_TOOL, **x_search_tool} if x_search_tool else _X_SEARCH_TOOL)
+
         payload["tools"] = tools
 
     # Add previous response for conversation continuity
     if previous_response_id:
         payload["previous_response_id"] = previous_response_id
 
-    headers = {
-        "Authorization": f"Bearer {XAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    if on_delta is not None:
+        payload["stream"] = True
+
+    # Reasoning output varies run to run, so only cache the fast model
+    cache = _response_cache()
+    cacheable = cache.enabled and not use_reasoning
+    if cacheable:
+        cache_key = LLMCache.make_key(payload)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Paraphrase matching only makes sense for standalone text queries
+    semantic_cache = _paraphrase_cache()
+    semantic = (
+        semantic_cache is not None
+        and not use_reasoning
+        and previous_response_id is None
+        and isinstance(input_content, str)
+    )
+    if semantic:
+        # Queries only match others sent with the same model/system/tools
+        namespace = LLMCache.make_key({**payload, "input": messages[:-1]})
+        try:
+            embedding = await semantic_cache.embed(input_content)
+            cached = semantic_cache.search(namespace, embedding)
+        except Exception:
+            # A broken embedder is a cache miss, not a failed request
+            logger.warning("Semantic cache lookup failed", exc_info=True)
+            semantic = False
+        else:
+            if cached is not None:
+                return cached
 
     try:
-        with httpx.Client(timeout=120.0) as client:
-            response = client.post(API_ENDPOINT, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-        return _parse_response(data)
+        data = await _send(payload, on_delta)
+
+        result = _parse_response(data)
+        # Never replay a truncated answer from the cache
+        cacheable = cacheable and result.status == "completed"
+        semantic = semantic and result.status == "completed"
+        if cacheable:
+            await cache.set(cache_key, result)
+        if semantic:
+            semantic_cache.add(namespace, input_content, embedding, result)
+        return result
 
     except httpx.HTTPStatusError as e:
-        return {
-            "error": f"API error: {e.response.status_code} - {e.response.text}",
-            "response_id": None,
-            "status": "failed"
-        }
+        return GrokResult(
+            response_id=None,
+            status="failed",
+            error=f"API error: {e.response.status_code} - {e.response.text}",
+        )
+    except StreamError as e:
+        return GrokResult(
+            response_id=None,
+            status="failed",
+            error=f"API error: {e}",
+        )
     except Exception as e:
-        return {
-            "error": f"Request failed: {str(e)}",
-            "response_id": None,
-            "status": "failed"
-        }
+        return GrokResult(
+            response_id=None,
+            status="failed",
+            error=f"Request failed: {str(e)}",
+        )
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Rate limits, transient server errors and read timeouts are worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS_CODES
+    return isinstance(exc, httpx.ReadTimeout)
+
+
+_backoff = tenacity.wait_random_exponential(multiplier=0.5, max=16)
+
+
+def _retry_wait(retry_state: tenacity.RetryCallState) -> float:
+    """Honor the server's Retry-After (in seconds) if given, else back off with jitter."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            return min(float(exc.response.headers["Retry-After"]), MAX_RETRY_AFTER)
+        except (KeyError, ValueError):
+            pass
+    return _backoff(retry_state)
+
+
+@tenacity.retry(
+    retry=tenacity.retry_if_exception(_is_retryable),
+    wait=_retry_wait,
+    stop=tenacity.stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True,
+)
+async def _send(
+    payload: dict,
+    on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> dict:
+    """POST a payload to the API and return the decoded response body."""
+    # Every attempt, retries included, goes through the rate limiter
+    rate_limiter = _rate_limiter()
+    if rate_limiter is not None:
+        await rate_limiter.acquire()
+
+    client = _http_client()
+    async with client.stream("POST", _settings().endpoint, content=orjson.dumps(payload)) as response:
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+        if on_delta is not None:
+            return await _read_event_stream(response, on_delta)
+        return await _read_response(response)
+
+
+async def _read_response(response: httpx.Response) -> dict:
+    """
+    Decode a JSON response body, stream-parsing it when it is large.
+
+    The decision is made on the decompressed size: Content-Length is the
+    compressed size under gzip/brotli, and is often absent over HTTP/2.
+    """
+    chunks = response.aiter_bytes()
+    head = bytearray()
+    async for chunk in chunks:
+        head += chunk
+        if len(head) > STREAM_PARSE_THRESHOLD:
+            return await _stream_parse(_prepend(bytes(head), chunks))
+    return orjson.loads(head)
+
+
+async def _prepend(first: bytes, rest):
+    """Yield an already-read chunk ahead of the rest of a byte stream."""
+    yield first
+    async for chunk in rest:
+        yield chunk
 
 
-def _parse_response(data: dict) -> dict:
+async def _read_event_stream(
+    response: httpx.Response,
+    on_delta: Callable[[str], Awaitable[None]],
+) -> dict:
+    """Consume a streamed (SSE) response, forwarding text deltas as they arrive."""
+    data = {}
+    text_parts = []
+    finished = False
+
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = line[len("data:"):].strip()
+            if chunk == "[DONE]":
+                break
+
+            event = orjson.loads(chunk)
+            event_type = event.get("type")
+            if event_type == "response.output_text.delta":
+                delta = event.get("delta", "")
+                text_parts.append(delta)
+                await on_delta(delta)
+            elif event_type == "response.created":
+                data = event.get("response", data)
+            elif event_type in ("response.completed", "response.incomplete"):
+                # The final event carries the full response object
+                data = event.get("response", data)
+                finished = True
+            elif event_type == "response.failed":
+                raise StreamError(_stream_error_message(event.get("response", {}).get("error") or {}))
+            elif event_type == "error":
+                raise StreamError(_stream_error_message(event))
+    except httpx.TransportError:
+        # Retrying would replay deltas the caller has already received, so
+        # only a stream that failed before its first delta is retried
+        if not text_parts:
+            raise
+
+    if not finished:
+        # Cut off before the final event: keep the streamed text, but say so
+        data["status"] = "incomplete"
+    # Fall back to the streamed text if the final event was never received
+    data.setdefault("output_text", "".join(text_parts))
+    return data
+
+
+def _stream_error_message(error: dict) -> str:
+    """Describe a streamed error object as "code - message"."""
+    message = error.get("message") or "Streamed response failed"
+    code = error.get("code")
+    return f"{code} - {message}" if code else message
+
+
+async def _stream_parse(chunks) -> dict:
+    """
+    Incrementally parse a Grok API response.
+
+    Only one output entry is materialized at a time, and each is trimmed to the
+    fields _parse_response reads, so large search result sets never sit in
+    memory as a whole document.
+    """
+    data = {"output": []}
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    builder = None
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        for prefix, event, value in events:
+            if builder is not None:
+                builder.event(event, value)
+                if event == "end_map" and prefix in ("output.item", "usage"):
+                    if prefix == "usage":
+                        data["usage"] = builder.value
+                    else:
+                        data["output"].append(_slim_output(builder.value))
+                    builder = None
+            elif event == "start_map" and prefix in ("output.item", "usage"):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix in ("id", "status", "output_text"):
+                data[prefix] = value
+        del events[:]
+
+    parser.close()
+    return data
+
+
+def _pick(item: dict, keys: tuple[str, ...]) -> dict:
+    return {key: item[key] for key in keys if key in item}
+
+
+def _slim_output(output: dict) -> dict:
+    """Trim an output entry down to the fields _parse_response reads."""
+    slim = _pick(output, ("type",))
+    if "content" in output:
+        slim["content"] = [
+            {
+                **_pick(content, ("type", "text")),
+                "annotations": [
+                    _pick(ann, ("url", "title")) for ann in content.get("annotations", [])
+                ],
+            }
+            for content in output["content"]
+        ]
+    if "results" in output:
+        slim["results"] = [
+            _pick(item, ("url", "title", "author")) for item in output["results"]
+        ]
+    return slim
+
+
+def _parse_response(data: dict) -> GrokResult:
     """Parse the Grok API response into a structured format."""
-    result = {
-        "response_id": data.get("id"),
-        "status": data.get("status", "completed"),
-        "text": "",
-        "sources": [],
-        "usage": data.get("usage", {})
-    }
+    text_parts = []
+    sources = []
+    seen_urls = set()
+
+    def add_source(url: Optional[str], title: str) -> None:
+        if url and url not in seen_urls:
+            seen_urls.add(url)
+            sources.append({"url": url, "title": title})
 
     # Handle output array
     for output in data.get("output", []):
@@ -175,17 +565,12 @@ def _parse_response(data: dict) -> dict:
             # Extract text content from message
             for content in output.get("content", []):
                 if content.get("type") == "output_text":
-                    result["text"] += content.get("text", "")
+                    text_parts.append(content.get("text", ""))
                 elif content.get("type") == "text":
-                    result["text"] += content.get("text", "")
+                    text_parts.append(content.get("text", ""))
                     # Extract annotations/citations if present
                     for ann in content.get("annotations", []):
-                        source = {
-                            "url": ann.get("url"),
-                            "title": ann.get("title", "Source")
-                        }
-                        if source["url"] and source not in result["sources"]:
-                            result["sources"].append(source)
+                        add_source(ann.get("url"), ann.get("title", "Source"))
 
         elif output_type == "web_search_call":
             # Capture web search query info
@@ -194,12 +579,7 @@ def _parse_response(data: dict) -> dict:
         elif output_type == "web_search_result":
             # Extract web search results
             for item in output.get("results", []):
-                source = {
-                    "url": item.get("url"),
-                    "title": item.get("title", "Web Result")
-                }
-                if source["url"] and source not in result["sources"]:
-                    result["sources"].append(source)
+                add_source(item.get("url"), item.get("title", "Web Result"))
 
         elif output_type == "x_search_call":
             # Capture X search query info
@@ -208,29 +588,35 @@ def _parse_response(data: dict) -> dict:
         elif output_type == "x_search_result":
             # Extract X search results (posts)
             for item in output.get("results", []):
-                source = {
-                    "url": item.get("url"),
-                    "title": item.get("title", item.get("author", "X Post"))
-                }
-                if source["url"] and source not in result["sources"]:
-                    result["sources"].append(source)
+                add_source(item.get("url"), item.get("title", item.get("author", "X Post")))
 
-    # Fallback: check for direct output text
-    if not result["text"] and "output_text" in data:
-        result["text"] = data.get("output_text", "")
+    text = "".join(text_parts)
 
-    return result
+    # Fallback: check for direct output text
+    if not text and "output_text" in data:
+        text = data.get("output_text", "")
+
+    return GrokResult(
+        response_id=data.get("id"),
+        status=data.get("status", "completed"),
+        text=text,
+        sources=sources,
+        usage=data.get("usage", {}),
+    )
 
 
-def _format_response(result: dict) -> str:
+def _format_response(result: GrokResult) -> str:
     """Format the parsed result into a readable string."""
-    if "error" in result:
-        return f"Error: {result['error']}"
+    if result.error is not None:
+        return f"Error: {result.error}"
+
+    output = [result.text]
 
-    output = [result.get("text", "")]
+    if result.status == "incomplete":
+        output.append("\n\n[Response incomplete: the output was cut off before it finished.]")
 
     # Add sources
-    sources = result.get("sources", [])
+    sources = result.sources
     if sources:
         output.append("\n\nSources:")
         for i, source in enumerate(sources, 1):
@@ -242,7 +628,7 @@ def _format_response(result: dict) -> str:
                 output.append(f"{i}. {source}")
 
     # Add follow-up instructions
-    response_id = result.get("response_id")
+    response_id = result.response_id
     if response_id:
         output.append("\n---")
         output.append(f"To follow up, use response_id: {response_id}")
@@ -250,10 +636,89 @@ def _format_response(result: dict) -> str:
     return "\n".join(output)
 
 
+_SEARCH_INSTRUCTION = """Search for the query and return results in this exact format:
+
+---
+TITLE: [page title]
+URL: [full url]
+SNIPPET: [2-3 sentence excerpt]
+---
+
+Return up to {max_results} results. No additional commentary or analysis."""
+
+_X_SEARCH_INSTRUCTION = """Search X for the query and return results in this exact format:
+
+---
+AUTHOR: @[handle]
+POST: [post content]
+URL: [full x.com url]
+---
+
+Return up to {max_results} results. No additional commentary or analysis."""
+
+
+@functools.lru_cache(maxsize=32)
+def _search_instruction(max_results: int) -> str:
+    return _SEARCH_INSTRUCTION.format(max_results=max_results)
+
+
+@functools.lru_cache(maxsize=32)
+def _x_search_instruction(max_results: int) -> str:
+    return _X_SEARCH_INSTRUCTION.format(max_results=max_results)
+
+
+async def _gather_limited(calls, max_concurrency: int) -> list:
+    """Await request coroutines concurrently, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*[run(call) for call in calls])
+
+
+# Request shapes for each tool: the fixed options are bound once here, so each
+# tool only passes what varies per call.
+_search_request = functools.partial(
+    _create_request,
+    max_tokens=4096,
+    use_web_search=True,
+)
+_ask_request = functools.partial(
+    _create_request,
+    system_instruction="Be concise and factual. Cite sources when using web information.",
+    use_web_search=True,
+)
+_think_request = functools.partial(
+    _create_request,
+    system_instruction="Think step by step. Be thorough and cite sources.",
+    use_web_search=True,
+    use_reasoning=True,
+)
+_chat_request = functools.partial(
+    _create_request,
+    system_instruction=None,
+    use_web_search=False,
+)
+_x_search_request = functools.partial(
+    _create_request,
+    max_tokens=4096,
+    use_web_search=False,
+    use_x_search=True,
+)
+_x_ask_request = functools.partial(
+    _create_request,
+    system_instruction="Be concise and factual. Cite X posts when referencing discussions or opinions.",
+    use_web_search=False,
+    use_x_search=True,
+)
+
+
 # MCP Tools
 
 @mcp.tool
-def search(
+async def search(
     query: str,
     max_results: int = 10,
 ) -> str:
@@ -270,28 +735,16 @@ def search(
     Returns:
         Structured search results with titles, URLs, and snippets
     """
-    system_instruction = f"""Search for the query and return results in this exact format:
-
----
-TITLE: [page title]
-URL: [full url]
-SNIPPET: [2-3 sentence excerpt]
----
-
-Return up to {max_results} results. No additional commentary or analysis."""
-
-    result = _create_request(
+    result = await _search_request(
         input_content=query,
-        system_instruction=system_instruction,
-        max_tokens=4096,
-        use_web_search=True,
+        system_instruction=_search_instruction(max_results),
     )
 
     return _format_response(result)
 
 
 @mcp.tool
-def ask(
+async def ask(
     query: str,
     response_id: Optional[str] = None,
     max_tokens: int = 8192,
@@ -311,22 +764,21 @@ def ask(
     Returns:
         Answer with sources. Use the returned response_id to ask follow-up questions.
     """
-    result = _create_request(
+    result = await _ask_request(
         input_content=query,
         previous_response_id=response_id,
         max_tokens=max_tokens,
-        system_instruction="Be concise and factual. Cite sources when using web information.",
-        use_web_search=True,
     )
 
     return _format_response(result)
 
 
 @mcp.tool
-def think(
+async def think(
     query: str,
     response_id: Optional[str] = None,
     max_tokens: int = 16384,
+    ctx: Optional[Context] = None,
 ) -> str:
     """
     Deep reasoning with Grok for complex problems related to X/Twitter ecosystem.
@@ -344,20 +796,28 @@ def think(
     Returns:
         Detailed answer with reasoning. Use the returned response_id to ask follow-up questions.
     """
-    result = _create_request(
+    on_delta = None
+    if ctx is not None:
+        # Stream partial text to the client as progress while Grok reasons
+        received = 0
+
+        async def on_delta(delta: str) -> None:
+            nonlocal received
+            received += len(delta)
+            await ctx.report_progress(received, message=delta)
+
+    result = await _think_request(
         input_content=query,
         previous_response_id=response_id,
         max_tokens=max_tokens,
-        system_instruction="Think step by step. Be thorough and cite sources.",
-        use_web_search=True,
-        use_reasoning=True,
+        on_delta=on_delta,
     )
 
     return _format_response(result)
 
 
 @mcp.tool
-def chat(
+async def chat(
     query: str,
     response_id: Optional[str] = None,
     max_tokens: int = 8192,
@@ -376,19 +836,17 @@ def chat(
     Returns:
         Response text. Use the returned response_id to continue the conversation.
     """
-    result = _create_request(
+    result = await _chat_request(
         input_content=query,
         previous_response_id=response_id,
         max_tokens=max_tokens,
-        system_instruction=None,
-        use_web_search=False,
     )
 
     return _format_response(result)
 
 
 @mcp.tool
-def x_search(
+async def x_search(
     query: str,
     max_results: int = 10,
     allowed_handles: Optional[list[str]] = None,
@@ -416,22 +874,9 @@ def x_search(
     Returns:
         Structured search results with post content, authors, and URLs
     """
-    system_instruction = f"""Search X for the query and return results in this exact format:
-
----
-AUTHOR: @[handle]
-POST: [post content]
-URL: [full x.com url]
----
-
-Return up to {max_results} results. No additional commentary or analysis."""
-
-    result = _create_request(
+    result = await _x_search_request(
         input_content=query,
-        system_instruction=system_instruction,
-        max_tokens=4096,
-        use_web_search=False,
-        use_x_search=True,
+        system_instruction=_x_search_instruction(max_results),
         allowed_x_handles=allowed_handles,
         excluded_x_handles=excluded_handles,
         from_date=from_date,
@@ -447,7 +892,7 @@ Return up to {max_results} results. No additional commentary or analysis."""
 
 
 @mcp.tool
-def x_ask(
+async def x_ask(
     query: str,
     response_id: Optional[str] = None,
     max_tokens: int = 8192,
@@ -478,13 +923,10 @@ def x_ask(
     Returns:
         Answer with X post sources. Use the returned response_id to ask follow-up questions.
     """
-    result = _create_request(
+    result = await _x_ask_request(
         input_content=query,
         previous_response_id=response_id,
         max_tokens=max_tokens,
-        system_instruction="Be concise and factual. Cite X posts when referencing discussions or opinions.",
-        use_web_search=False,
-        use_x_search=True,
         allowed_x_handles=allowed_handles,
         excluded_x_handles=excluded_handles,
         from_date=from_date,
@@ -496,5 +938,63 @@ def x_ask(
     return _format_response(result)
 
 
+@mcp.tool
+async def batch_ask(
+    queries: list[str],
+    max_tokens: int = 8192,
+) -> list[str]:
+    """
+    Ask Grok several independent questions at once with web search.
+
+    Queries run concurrently, so the batch takes about as long as the slowest
+    single question. Each answer is a fresh conversation.
+
+    Args:
+        queries: List of questions
+        max_tokens: Maximum response length per answer (default: 8192)
+
+    Returns:
+        One answer with sources per query, in the same order as the queries.
+    """
+    results = await _gather_limited(
+        [_ask_request(input_content=query, max_tokens=max_tokens) for query in queries],
+        MAX_BATCH_CONCURRENCY,
+    )
+
+    return [_format_response(result) for result in results]
+
+
+@mcp.tool
+async def multi_search(
+    queries: list[str],
+    max_results: int = 10,
+    max_concurrency: int = 10,
+) -> list[str]:
+    """
+    Run several quick web searches at once. Returns structured results per query.
+
+    Use this instead of repeated search calls when you need results for many
+    queries; they run concurrently.
+
+    Args:
+        queries: List of search queries
+        max_results: Maximum number of results per query (default: 10)
+        max_concurrency: Maximum number of searches in flight at once (default: 10)
+
+    Returns:
+        Structured search results for each query, in the same order as the queries.
+    """
+    system_instruction = _search_instruction(max_results)
+    results = await _gather_limited(
+        [
+            _search_request(input_content=query, system_instruction=system_instruction)
+            for query in queries
+        ],
+        max_concurrency,
+    )
+
+    return [_format_response(result) for result in results]
+
+
 if __name__ == "__main__":
     mcp.run()
@@ -8,8 +8,70 @@ the server module can be imported properly.
 import os
 import sys
 
+import pytest
+from httpx import Response
+
 # Add parent directory to path for server module import
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Set required environment variable before any test imports
+# Set required environment variable before any test imports, and pin the
+# optional features off regardless of the developer's shell
 os.environ.setdefault("XAI_API_KEY", "test_api_key")
+os.environ["GROK_CACHE_TTL"] = "0"
+os.environ["GROK_MAX_RPM"] = "0"
+os.environ.pop("GROK_CACHE_URL", None)
+os.environ.pop("GROK_SEMANTIC_CACHE_THRESHOLD", None)
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(monkeypatch):
+    """Keep a developer's server/.env out of the settings tests run with."""
+    import server
+
+    monkeypatch.setattr(server, "load_dotenv", lambda: None)
+    server._settings.cache_clear()
+    yield
+    server._settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def retry_sleeps(monkeypatch):
+    """Skip real retry backoff; records the requested delays instead."""
+    import server
+
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(server._send.retry, "sleep", fake_sleep)
+    return delays
+
+
+@pytest.fixture(scope="session")
+def generic_mock_response():
+    """Minimal successful API response, for tests that only inspect the request."""
+    return {
+        "id": "resp_generic",
+        "status": "completed",
+        "output": [
+            {
+                "type": "message",
+                "content": [{"type": "output_text", "text": "Generic result"}]
+            }
+        ]
+    }
+
+
+@pytest.fixture
+def mocked_route(respx_mock, generic_mock_response):
+    """
+    The API endpoint mocked with the generic response.
+
+    Tests needing another payload override it with mocked_route.mock(...).
+    """
+    from server import API_ENDPOINT
+
+    return respx_mock.post(API_ENDPOINT).mock(
+        return_value=Response(200, json=generic_mock_response)
+    )
@@ -0,0 +1,141 @@
+"""
+Tests for the response cache.
+
+Run with: uv run pytest (or uv run pytest -n auto to spread tests across cores)
+"""
+
+import sys
+import types
+
+import orjson
+import pytest
+
+import _cache
+from _cache import LLMCache, MemoryBackend, RedisBackend
+from server import GrokResult
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for RedisBackend."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def scan_iter(self, match):
+        for key in list(self.store):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point RedisBackend at an in-memory FakeRedis instead of a server."""
+    client = FakeRedis()
+    asyncio_module = types.SimpleNamespace(from_url=lambda url: client, RedisError=OSError)
+    monkeypatch.setitem(sys.modules, "redis", types.SimpleNamespace(asyncio=asyncio_module))
+    monkeypatch.setitem(sys.modules, "redis.asyncio", asyncio_module)
+    return client
+
+
+class TestMemoryBackend:
+    """Tests for the in-process LRU backend."""
+
+    async def test_set_and_get(self):
+        """Stored values are returned until they expire."""
+        backend = MemoryBackend()
+
+        await backend.set("key", {"text": "cached"}, ttl=60)
+
+        assert await backend.get("key") == {"text": "cached"}
+        assert await backend.get("missing") is None
+
+    async def test_entries_expire(self, monkeypatch):
+        """Entries past their TTL are dropped."""
+        now = [1000.0]
+        monkeypatch.setattr(_cache.time, "monotonic", lambda: now[0])
+        backend = MemoryBackend()
+
+        await backend.set("key", "value", ttl=10)
+        now[0] += 11
+
+        assert await backend.get("key") is None
+        assert "key" not in backend._entries
+
+    async def test_least_recently_used_evicted(self):
+        """The least recently used entry is evicted when full."""
+        backend = MemoryBackend(max_size=2)
+
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")  # "b" is now least recently used
+        await backend.set("c", 3, ttl=60)
+
+        assert await backend.get("a") == 1
+        assert await backend.get("b") is None
+        assert await backend.get("c") == 3
+
+
+class TestRedisBackend:
+    """Tests for the Redis backend, against a fake client."""
+
+    async def test_round_trip_decodes(self, fake_redis):
+        """Values are stored as JSON and rebuilt with the decode hook."""
+        backend = RedisBackend("redis://fake", decode=lambda value: tuple(value))
+
+        await backend.set("key", [1, 2], ttl=60)
+
+        assert fake_redis.store["grok:response:key"] == b"[1,2]"
+        assert await backend.get("key") == (1, 2)
+        assert await backend.get("missing") is None
+
+    async def test_unreadable_entries_are_misses(self, fake_redis):
+        """Corrupt JSON or entries the decode hook rejects are cache misses."""
+        backend = RedisBackend("redis://fake", decode=lambda value: GrokResult(**value))
+        fake_redis.store["grok:response:corrupt"] = b"{not json"
+        fake_redis.store["grok:response:foreign"] = orjson.dumps(
+            {"response_id": "resp_1", "extra": "field from another version"}
+        )
+
+        assert await backend.get("corrupt") is None
+        assert await backend.get("foreign") is None
+
+    async def test_clear_only_removes_prefixed_keys(self, fake_redis):
+        """clear() leaves keys outside the backend's prefix alone."""
+        backend = RedisBackend("redis://fake")
+        await backend.set("key", "value", ttl=60)
+        fake_redis.store["other:key"] = b"1"
+
+        await backend.clear()
+
+        assert fake_redis.store == {"other:key": b"1"}
+
+
+class TestLLMCache:
+    """Tests for the LLMCache wrapper."""
+
+    def test_key_ignores_dict_order(self):
+        """Equivalent payloads hash to the same key."""
+        first = {"model": "m", "input": [{"role": "user", "content": "q"}]}
+        second = {"input": [{"content": "q", "role": "user"}], "model": "m"}
+
+        assert LLMCache.make_key(first) == LLMCache.make_key(second)
+        assert LLMCache.make_key(first) != LLMCache.make_key({**first, "model": "other"})
+
+    async def test_disabled_with_zero_ttl(self):
+        """A zero TTL never stores anything."""
+        cache = LLMCache(ttl=0)
+
+        await cache.set("key", "value")
+
+        assert not cache.enabled
+        assert await cache.get("key") is None
@@ -0,0 +1,97 @@
+"""
+Tests for the semantic response cache.
+
+Uses a toy bag-of-words embedder so no embedding model is downloaded.
+Run with: uv run pytest (or uv run pytest -n auto to spread tests across cores)
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import _semantic_cache
+import server
+from _semantic_cache import SemanticCache
+from server import _create_request
+
+VOCABULARY = ["weather", "sf", "san", "francisco", "stock", "price", "tesla"]
+
+
+def bag_of_words(text: str):
+    words = text.lower().replace("?", "").split()
+    return [float(words.count(term)) for term in VOCABULARY]
+
+
+class TestSemanticCache:
+    """Tests for SemanticCache lookups."""
+
+    async def test_similar_query_hits(self):
+        """A paraphrase above the threshold returns the stored value."""
+        cache = SemanticCache(bag_of_words, threshold=0.8)
+        vector = await cache.embed("weather in sf")
+        cache.add("ns", "weather in sf", vector, "sunny")
+
+        hit = cache.search("ns", await cache.embed("sf weather?"))
+        miss = cache.search("ns", await cache.embed("tesla stock price"))
+
+        assert hit == "sunny"
+        assert miss is None
+
+    async def test_namespaces_are_isolated(self):
+        """Entries from another namespace never match."""
+        cache = SemanticCache(bag_of_words, threshold=0.8)
+        vector = await cache.embed("weather in sf")
+        cache.add("search", "weather in sf", vector, "results")
+
+        assert cache.search("chat", vector) is None
+
+    async def test_entries_expire(self, monkeypatch):
+        """Entries past their TTL never match and are dropped."""
+        now = [1000.0]
+        monkeypatch.setattr(_semantic_cache.time, "monotonic", lambda: now[0])
+        cache = SemanticCache(bag_of_words, threshold=0.8, ttl=10)
+        cache.add("ns", "weather in sf", await cache.embed("weather in sf"), "sunny")
+        now[0] += 11
+
+        assert cache.search("ns", await cache.embed("sf weather?")) is None
+        assert not cache._entries
+
+    async def test_size_is_bounded(self):
+        """The least recently used entry is evicted when full."""
+        cache = SemanticCache(bag_of_words, max_size=1)
+        cache.add("ns", "weather sf", await cache.embed("weather sf"), "first")
+        cache.add("ns", "tesla stock", await cache.embed("tesla stock"), "second")
+
+        assert cache.search("ns", await cache.embed("weather sf")) is None
+        assert cache.search("ns", await cache.embed("tesla stock")) == "second"
+
+
+class TestSemanticCacheRequests:
+    """Tests for the semantic cache inside _create_request."""
+
+    async def test_paraphrase_skips_api(self, mocked_route, monkeypatch):
+        """A paraphrased standalone query is answered from the cache."""
+        cache = SemanticCache(bag_of_words, threshold=0.8)
+        monkeypatch.setattr(server, "_paraphrase_cache", lambda: cache)
+
+        first = await _create_request(input_content="weather in sf")
+        second = await _create_request(input_content="SF weather?")
+        # Follow-ups and different tool setups always go to the API
+        await _create_request(input_content="SF weather?", previous_response_id="resp_generic")
+        await _create_request(input_content="SF weather?", use_web_search=False)
+
+        assert second == first
+        assert mocked_route.call_count == 3
+
+    async def test_embedder_failure_falls_through(self, mocked_route, monkeypatch):
+        """A failing embedder is treated as a miss and the API still answers."""
+        def broken_embedder(text):
+            raise ModuleNotFoundError("No module named 'fastembed'")
+
+        cache = SemanticCache(broken_embedder)
+        monkeypatch.setattr(server, "_paraphrase_cache", lambda: cache)
+
+        result = await _create_request(input_content="weather in sf")
+
+        assert result.text == "Generic result"
+        assert mocked_route.call_count == 1
@@ -2,170 +2,371 @@
 Tests for Grok API MCP Server
 
 Uses pytest with respx for HTTP mocking.
-Run with: uv run pytest
+Run with: uv run pytest (or uv run pytest -n auto to spread tests across cores)
 """
 
-import json
+import asyncio
+import gzip
 
-import respx
+import httpx
+import orjson
+import pytest
 from httpx import Response
 
 # Import server module (conftest.py handles path and env setup)
+import server
+from _cache import LLMCache
 from server import (
+    GrokResult,
     _parse_response,
     _format_response,
     _create_request,
-    API_ENDPOINT,
+    _stream_parse,
+    ask,
+    batch_ask,
+    chat,
+    multi_search,
+    search,
+    think,
+    x_ask,
+    x_search,
 )
 
 
-class TestParseResponse:
-    """Tests for _parse_response function."""
+def _body(route, call: int = 0) -> dict:
+    """
+    Decode the JSON body of a request recorded by a respx route.
 
-    def test_parse_simple_message(self):
-        """Parse a simple message response."""
-        data = {
-            "id": "resp_123",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "message",
-                    "content": [
-                        {"type": "output_text", "text": "Hello, world!"}
-                    ]
-                }
-            ],
-            "usage": {"input_tokens": 10, "output_tokens": 5}
-        }
+    Only needed for structural checks: orjson writes compact, ordered JSON, so
+    single-field checks match `request.content` bytes directly.
+    """
+    return orjson.loads(route.calls[call].request.content)
 
-        result = _parse_response(data)
 
-        assert result["response_id"] == "resp_123"
-        assert result["status"] == "completed"
-        assert result["text"] == "Hello, world!"
-        assert result["sources"] == []
-        assert result["usage"]["input_tokens"] == 10
+def _tools_by_type(body: dict) -> dict:
+    """Index a request body's tools by their type."""
+    return {tool["type"]: tool for tool in body.get("tools", [])}
 
-    def test_parse_message_with_annotations(self):
-        """Parse message with URL annotations."""
-        data = {
-            "id": "resp_456",
-            "status": "completed",
-            "output": [
+
+# Response payloads for _parse_response tests. Shared across tests; treat as
+# read-only.
+SIMPLE_MESSAGE = {
+    "id": "resp_123",
+    "status": "completed",
+    "output": [
+        {
+            "type": "message",
+            "content": [
+                {"type": "output_text", "text": "Hello, world!"}
+            ]
+        }
+    ],
+    "usage": {"input_tokens": 10, "output_tokens": 5}
+}
+
+ANNOTATED_MESSAGE = {
+    "id": "resp_456",
+    "status": "completed",
+    "output": [
+        {
+            "type": "message",
+            "content": [
                 {
-                    "type": "message",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "Check this source.",
-                            "annotations": [
-                                {"url": "https://example.com", "title": "Example"}
-                            ]
-                        }
+                    "type": "text",
+                    "text": "Check this source.",
+                    "annotations": [
+                        {"url": "https://example.com", "title": "Example"}
                     ]
                 }
             ]
         }
-
-        result = _parse_response(data)
-
-        assert result["text"] == "Check this source."
-        assert len(result["sources"]) == 1
-        assert result["sources"][0]["url"] == "https://example.com"
-        assert result["sources"][0]["title"] == "Example"
-
-    def test_parse_web_search_result(self):
-        """Parse web search results."""
-        data = {
-            "id": "resp_789",
-            "status": "completed",
-            "output": [
+    ]
+}
+
+WEB_SEARCH_RESULT = {
+    "id": "resp_789",
+    "status": "completed",
+    "output": [
+        {
+            "type": "web_search_result",
+            "results": [
+                {"url": "https://news.com/article", "title": "News Article"},
+                {"url": "https://blog.com/post", "title": "Blog Post"}
+            ]
+        },
+        {
+            "type": "message",
+            "content": [{"type": "output_text", "text": "Found results."}]
+        }
+    ]
+}
+
+X_SEARCH_RESULT = {
+    "id": "resp_x123",
+    "status": "completed",
+    "output": [
+        {
+            "type": "x_search_result",
+            "results": [
+                {"url": "https://x.com/user/status/123", "title": "@user"},
+                {"url": "https://x.com/other/status/456", "author": "other"}
+            ]
+        },
+        {
+            "type": "message",
+            "content": [{"type": "output_text", "text": "Found X posts."}]
+        }
+    ]
+}
+
+MULTIPLE_WEB_SEARCH_RESULTS = {
+    "id": "resp_multi",
+    "status": "completed",
+    "output": [
+        {
+            "type": "web_search_result",
+            "results": [
+                {"url": "https://example1.com", "title": "First"}
+            ]
+        },
+        {
+            "type": "web_search_result",
+            "results": [
+                {"url": "https://example2.com", "title": "Second"}
+            ]
+        },
+        {
+            "type": "message",
+            "content": [{"type": "output_text", "text": "Results."}]
+        }
+    ]
+}
+
+DUPLICATE_URLS = {
+    "id": "resp_dup",
+    "status": "completed",
+    "output": [
+        {
+            "type": "web_search_result",
+            "results": [
+                {"url": "https://example.com", "title": "Example"},
+                {"url": "https://example.com", "title": "Example (again)"}
+            ]
+        },
+        {
+            "type": "message",
+            "content": [
+                {"type": "text", "text": "Part one. "},
                 {
-                    "type": "web_search_result",
-                    "results": [
-                        {"url": "https://news.com/article", "title": "News Article"},
-                        {"url": "https://blog.com/post", "title": "Blog Post"}
+                    "type": "text",
+                    "text": "Part two.",
+                    "annotations": [
+                        {"url": "https://example.com", "title": "Cited"},
+                        {"url": "https://other.com", "title": "Other"}
                     ]
-                },
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Found results."}]
                 }
             ]
         }
+    ]
+}
 
-        result = _parse_response(data)
+EMPTY_RESPONSE = {"id": "resp_empty", "output": []}
 
-        assert result["text"] == "Found results."
-        assert len(result["sources"]) == 2
-        assert result["sources"][0]["title"] == "News Article"
-        assert result["sources"][1]["title"] == "Blog Post"
-
-    def test_parse_x_search_result(self):
-        """Parse X search results."""
-        data = {
-            "id": "resp_x123",
-            "status": "completed",
-            "output": [
+ROUND_TRIP_RESPONSE = {
+    "id": "resp_json",
+    "output": [
+        {
+            "type": "web_search_result",
+            "results": [{"url": "https://example.com", "title": "Example"}]
+        }
+    ],
+    "usage": {"input_tokens": 1}
+}
+
+# Large search response for the streaming parser
+LARGE_RESPONSE = {
+    "id": "resp_stream",
+    "status": "completed",
+    "output": [
+        {
+            "type": "web_search_result",
+            "results": [
                 {
-                    "type": "x_search_result",
-                    "results": [
-                        {"url": "https://x.com/user/status/123", "title": "@user"},
-                        {"url": "https://x.com/other/status/456", "author": "other"}
-                    ]
-                },
+                    "url": f"https://example.com/{i}",
+                    "title": f"Result {i}",
+                    "snippet": "x" * 200,
+                }
+                for i in range(50)
+            ]
+        },
+        {
+            "type": "message",
+            "content": [
                 {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Found X posts."}]
+                    "type": "text",
+                    "text": "Streamed answer.",
+                    "annotations": [{"url": "https://cited.com"}]
                 }
             ]
         }
+    ],
+    "usage": {"input_tokens": 10, "output_tokens": 5, "cost": 0.25}
+}
+
+
+class TestParseResponse:
+    """Tests for _parse_response function."""
 
-        result = _parse_response(data)
+    def test_parse_simple_message(self):
+        """Parse a simple message response."""
+        result = _parse_response(SIMPLE_MESSAGE)
+
+        assert result.response_id == "resp_123"
+        assert result.status == "completed"
+        assert result.text == "Hello, world!"
+        assert result.sources == []
+        assert result.usage["input_tokens"] == 10
+
+    def test_parse_message_with_annotations(self):
+        """Parse message with URL annotations."""
+        result = _parse_response(ANNOTATED_MESSAGE)
 
-        assert result["text"] == "Found X posts."
-        assert len(result["sources"]) == 2
-        assert result["sources"][0]["title"] == "@user"
-        assert result["sources"][1]["title"] == "other"  # Falls back to author
+        assert result.text == "Check this source."
+        assert len(result.sources) == 1
+        assert result.sources[0]["url"] == "https://example.com"
+        assert result.sources[0]["title"] == "Example"
+
+    def test_parse_web_search_result(self):
+        """Parse web search results."""
+        result = _parse_response(WEB_SEARCH_RESULT)
+
+        assert result.text == "Found results."
+        assert len(result.sources) == 2
+        assert result.sources[0]["title"] == "News Article"
+        assert result.sources[1]["title"] == "Blog Post"
+
+    def test_parse_x_search_result(self):
+        """Parse X search results."""
+        result = _parse_response(X_SEARCH_RESULT)
+
+        assert result.text == "Found X posts."
+        assert len(result.sources) == 2
+        assert result.sources[0]["title"] == "@user"
+        assert result.sources[1]["title"] == "other"  # Falls back to author
 
     def test_parse_sources_from_different_outputs(self):
         """Sources from multiple outputs are collected."""
-        data = {
-            "id": "resp_multi",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "web_search_result",
-                    "results": [
-                        {"url": "https://example1.com", "title": "First"}
-                    ]
-                },
-                {
-                    "type": "web_search_result",
-                    "results": [
-                        {"url": "https://example2.com", "title": "Second"}
-                    ]
-                },
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Results."}]
-                }
-            ]
-        }
+        result = _parse_response(MULTIPLE_WEB_SEARCH_RESULTS)
+
+        assert len(result.sources) == 2
+
+    def test_parse_duplicate_urls_deduplicated(self):
+        """The same URL cited in several places is listed once."""
+        result = _parse_response(DUPLICATE_URLS)
+
+        assert result.text == "Part one. Part two."
+        assert [s["url"] for s in result.sources] == [
+            "https://example.com",
+            "https://other.com",
+        ]
+        assert result.sources[0]["title"] == "Example"
 
-        result = _parse_response(data)
+    def test_result_json_round_trip(self):
+        """Results survive the JSON round trip used by the Redis cache."""
+        result = _parse_response(ROUND_TRIP_RESPONSE)
 
-        assert len(result["sources"]) == 2
+        assert GrokResult(**orjson.loads(orjson.dumps(result))) == result
 
     def test_parse_empty_response(self):
         """Handle empty or minimal response."""
-        data = {"id": "resp_empty", "output": []}
+        result = _parse_response(EMPTY_RESPONSE)
+
+        assert result.response_id == "resp_empty"
+        assert result.text == ""
+        assert result.sources == []
+
+
+class TestStreamParse:
+    """Tests for incremental parsing of large responses."""
+
+    async def test_matches_full_parse(self):
+        """Streaming in small chunks gives the same result as a full parse."""
+        body = orjson.dumps(LARGE_RESPONSE)
+
+        async def chunks():
+            for i in range(0, len(body), 7):
+                yield body[i:i + 7]
+
+        data = await _stream_parse(chunks())
+
+        assert _parse_response(data) == _parse_response(LARGE_RESPONSE)
+        assert data["usage"]["cost"] == 0.25
+        assert data["output"][1]["content"][0]["annotations"] == [{"url": "https://cited.com"}]
+
+    async def test_drops_unused_fields(self):
+        """Fields _parse_response never reads are not kept."""
+        body = orjson.dumps(LARGE_RESPONSE)
 
-        result = _parse_response(data)
+        async def chunks():
+            yield body
 
-        assert result["response_id"] == "resp_empty"
-        assert result["text"] == ""
-        assert result["sources"] == []
+        data = await _stream_parse(chunks())
+
+        assert "snippet" not in data["output"][0]["results"][0]
+
+    async def test_large_responses_stream_parsed(self, mocked_route, monkeypatch):
+        """Responses over the size threshold go through the streaming parser."""
+        monkeypatch.setattr(server, "STREAM_PARSE_THRESHOLD", 0)
+        mocked_route.mock(
+            return_value=Response(200, json=LARGE_RESPONSE)
+        )
+
+        result = await _create_request(input_content="big search")
+
+        assert result.text == "Streamed answer."
+        assert len(result.sources) == 51
+        assert result.usage["output_tokens"] == 5
+
+    async def test_threshold_uses_decompressed_size(self, mocked_route, monkeypatch):
+        """A gzipped body with a small Content-Length is still stream-parsed when large."""
+        body = orjson.dumps(LARGE_RESPONSE)
+        compressed = gzip.compress(body)
+        monkeypatch.setattr(server, "STREAM_PARSE_THRESHOLD", len(compressed) + 1)
+        mocked_route.mock(
+            return_value=Response(200, content=compressed, headers={"Content-Encoding": "gzip"})
+        )
+        parse = server._stream_parse
+        streamed = []
+
+        async def spy(chunks):
+            streamed.append(True)
+            return await parse(chunks)
+
+        monkeypatch.setattr(server, "_stream_parse", spy)
+
+        result = await _create_request(input_content="big search")
+
+        assert streamed
+        assert len(result.sources) == 51
+
+    async def test_small_chunked_response_decoded_directly(self, mocked_route, monkeypatch):
+        """A small body without Content-Length skips the streaming parser."""
+        async def chunked():
+            body = orjson.dumps(SIMPLE_MESSAGE)
+            yield body[:10]
+            yield body[10:]
+
+        async def unexpected(chunks):
+            raise AssertionError("small responses should not be stream-parsed")
+
+        monkeypatch.setattr(server, "_stream_parse", unexpected)
+        mocked_route.mock(return_value=Response(200, content=chunked()))
+
+        result = await _create_request(input_content="small")
+
+        assert mocked_route.calls[0].response.headers.get("Content-Length") is None
+        assert result.error is None
+        assert result.response_id == SIMPLE_MESSAGE["id"]
 
 
 class TestFormatResponse:
@@ -173,11 +374,11 @@ class TestFormatResponse:
 
     def test_format_simple_response(self):
         """Format a simple response with text only."""
-        result = {
-            "text": "Hello, world!",
-            "sources": [],
-            "response_id": "resp_123"
-        }
+        result = GrokResult(
+            text="Hello, world!",
+            sources=[],
+            response_id="resp_123"
+        )
 
         output = _format_response(result)
 
@@ -187,14 +388,14 @@ class TestFormatResponse:
 
     def test_format_response_with_sources(self):
         """Format response with sources."""
-        result = {
-            "text": "Answer text.",
-            "sources": [
+        result = GrokResult(
+            text="Answer text.",
+            sources=[
                 {"title": "Source 1", "url": "https://example1.com"},
                 {"title": "Source 2", "url": "https://example2.com"}
             ],
-            "response_id": "resp_456"
-        }
+            response_id="resp_456"
+        )
 
         output = _format_response(result)
 
@@ -205,11 +406,11 @@ class TestFormatResponse:
 
     def test_format_error_response(self):
         """Format an error response."""
-        result = {
-            "error": "API rate limit exceeded",
-            "response_id": None,
-            "status": "failed"
-        }
+        result = GrokResult(
+            error="API rate limit exceeded",
+            response_id=None,
+            status="failed"
+        )
 
         output = _format_response(result)
 
@@ -217,11 +418,11 @@ class TestFormatResponse:
 
     def test_format_response_no_id(self):
         """Format response without response_id."""
-        result = {
-            "text": "Text",
-            "sources": [],
-            "response_id": None
-        }
+        result = GrokResult(
+            text="Text",
+            sources=[],
+            response_id=None
+        )
 
         output = _format_response(result)
 
@@ -232,91 +433,61 @@ class TestFormatResponse:
 class TestCreateRequest:
     """Tests for _create_request function with mocked HTTP."""
 
-    @respx.mock
-    def test_web_search_request(self):
-        """Test request with web search enabled."""
-        mock_response = {
-            "id": "resp_web",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Web result"}]
-                }
-            ],
-            "usage": {"input_tokens": 10, "output_tokens": 20}
-        }
-
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
-        result = _create_request(
-            input_content="test query",
-            use_web_search=True,
-            use_x_search=False
-        )
-
-        assert route.called
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
-
-        # Check tools contains web_search
-        assert any(t.get("type") == "web_search" for t in body.get("tools", []))
-        assert not any(t.get("type") == "x_search" for t in body.get("tools", []))
-        assert result["text"] == "Web result"
-
-    @respx.mock
-    def test_x_search_request(self):
-        """Test request with X search enabled."""
-        mock_response = {
-            "id": "resp_x",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "X result"}]
-                }
-            ]
-        }
-
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
-        result = _create_request(
-            input_content="test query",
-            use_web_search=False,
-            use_x_search=True
-        )
-
-        assert route.called
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
-
-        assert any(t.get("type") == "x_search" for t in body.get("tools", []))
-        assert not any(t.get("type") == "web_search" for t in body.get("tools", []))
-        assert result["text"] == "X result"
-
-    @respx.mock
-    def test_x_search_with_filters(self):
+    @pytest.mark.parametrize(
+        "kwargs, check",
+        [
+            pytest.param(
+                {"use_web_search": True, "use_x_search": False},
+                lambda content: b'"tools":[{"type":"web_search"}]' in content,
+                id="web_search",
+            ),
+            pytest.param(
+                {"use_web_search": False, "use_x_search": True},
+                lambda content: b'"tools":[{"type":"x_search"}]' in content,
+                id="x_search",
+            ),
+            pytest.param(
+                {"use_web_search": True, "use_x_search": True},
+                lambda content: b'"tools":[{"type":"web_search"},{"type":"x_search"}]' in content,
+                id="both_searches",
+            ),
+            pytest.param(
+                {"use_web_search": False, "use_x_search": False},
+                lambda content: b'"tools"' not in content and b'"max_output_tokens":8192' in content,
+                id="no_tools_for_chat",
+            ),
+            pytest.param(
+                {"use_reasoning": True},
+                lambda content: b'"model":"grok-4-1-fast"' in content,
+                id="reasoning_model",
+            ),
+            pytest.param(
+                {"use_reasoning": False},
+                lambda content: b'"model":"grok-4-1-fast-non-reasoning"' in content,
+                id="non_reasoning_model",
+            ),
+            pytest.param(
+                {"system_instruction": "Be concise."},
+                lambda content: b'"input":[{"role":"system","content":"Be concise."}' in content,
+                id="system_instruction",
+            ),
+            pytest.param(
+                {"previous_response_id": "resp_previous"},
+                lambda content: b'"previous_response_id":"resp_previous"' in content,
+                id="previous_response_id",
+            ),
+        ],
+    )
+    async def test_request_body(self, mocked_route, kwargs, check):
+        """Test the request body built for each option combination."""
+        result = await _create_request(input_content="test query", **kwargs)
+
+        assert check(mocked_route.calls[0].request.content)
+        assert result.text == "Generic result"
+
+    async def test_x_search_with_filters(self, mocked_route):
         """Test X search with all filter options."""
-        mock_response = {
-            "id": "resp_filtered",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Filtered"}]
-                }
-            ]
-        }
-
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
-        _create_request(
+        await _create_request(
             input_content="test",
             use_web_search=False,
             use_x_search=True,
@@ -328,194 +499,301 @@ class TestCreateRequest:
             enable_video_understanding=True
         )
 
-        assert route.called
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        assert mocked_route.called
+        body = _body(mocked_route)
 
-        x_search_tool = next(t for t in body["tools"] if t["type"] == "x_search")
+        x_search_tool = _tools_by_type(body)["x_search"]
         assert x_search_tool["allowed_x_handles"] == ["user1", "user2"]
         assert x_search_tool["from_date"] == "2025-01-01"
         assert x_search_tool["to_date"] == "2025-01-15"
         assert x_search_tool["enable_image_understanding"] is True
         assert x_search_tool["enable_video_understanding"] is True
 
-    @respx.mock
-    def test_reasoning_model(self):
-        """Test that reasoning model is used when specified."""
-        mock_response = {
-            "id": "resp_think",
-            "status": "completed",
-            "output": [
-                {
-                    "type": "message",
-                    "content": [{"type": "output_text", "text": "Thought"}]
-                }
-            ]
-        }
-
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
+    async def test_api_error_handling(self, mocked_route):
+        """Test handling of API errors."""
+        mocked_route.mock(
+            return_value=Response(429, json={"error": "Rate limited"})
         )
 
-        _create_request(
-            input_content="think about this",
-            use_reasoning=True
-        )
+        result = await _create_request(input_content="test")
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        assert mocked_route.call_count == 4  # Retried until attempts run out
+        assert result.error is not None
+        assert "429" in result.error
+        assert result.status == "failed"
 
-        assert body["model"] == "grok-4-1-fast"
+    async def test_transient_errors_retried(self, mocked_route, retry_sleeps):
+        """Test that 429/5xx responses are retried, honoring Retry-After."""
+        mocked_route.mock(side_effect=[
+            Response(429, headers={"Retry-After": "3"}, json={"error": "Rate limited"}),
+            Response(503, json={"error": "Unavailable"}),
+            Response(200, json={"id": "resp_retry", "status": "completed", "output": []}),
+        ])
 
-    @respx.mock
-    def test_non_reasoning_model(self):
-        """Test that non-reasoning model is used by default."""
-        mock_response = {
-            "id": "resp_fast",
-            "status": "completed",
-            "output": []
-        }
+        result = await _create_request(input_content="test")
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
+        assert mocked_route.call_count == 3
+        assert result.response_id == "resp_retry"
+        assert retry_sleeps[0] == 3.0
+        assert 0 <= retry_sleeps[1] <= 16
 
-        _create_request(
-            input_content="quick question",
-            use_reasoning=False
+    async def test_client_errors_not_retried(self, mocked_route, retry_sleeps):
+        """Test that other 4xx errors fail immediately."""
+        mocked_route.mock(
+            return_value=Response(400, json={"error": "Bad request"})
         )
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        result = await _create_request(input_content="test")
 
-        assert body["model"] == "grok-4-1-fast-non-reasoning"
+        assert mocked_route.call_count == 1
+        assert "400" in result.error
+        assert retry_sleeps == []
 
-    @respx.mock
-    def test_system_instruction(self):
-        """Test that system instruction is included."""
-        mock_response = {"id": "resp_sys", "status": "completed", "output": []}
+    async def test_missing_api_key(self, monkeypatch):
+        """Test that a missing API key is reported on first use, not at import."""
+        monkeypatch.delenv("XAI_API_KEY")
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
+        result = await _create_request(input_content="test")
 
-        _create_request(
-            input_content="query",
-            system_instruction="Be concise."
-        )
+        assert result.status == "failed"
+        assert "XAI_API_KEY environment variable is required" in result.error
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+    async def test_malformed_setting(self, monkeypatch):
+        """Test that a malformed numeric setting names the variable."""
+        monkeypatch.setenv("GROK_MAX_RPM", "sixty")
 
-        system_msg = next((m for m in body["input"] if m["role"] == "system"), None)
-        assert system_msg is not None
-        assert system_msg["content"] == "Be concise."
+        result = await _create_request(input_content="test")
 
-    @respx.mock
-    def test_previous_response_id(self):
-        """Test conversation continuity with response_id."""
-        mock_response = {"id": "resp_cont", "status": "completed", "output": []}
+        assert result.error == "Configuration error: GROK_MAX_RPM must be a whole number, got 'sixty'"
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
+    async def test_max_handles_limit(self, mocked_route):
+        """Test that allowed_x_handles is limited to 10."""
+        handles = [f"user{i}" for i in range(15)]  # 15 handles
 
-        _create_request(
-            input_content="follow up",
-            previous_response_id="resp_previous"
+        await _create_request(
+            input_content="test",
+            use_x_search=True,
+            allowed_x_handles=handles
         )
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        body = _body(mocked_route)
 
-        assert body["previous_response_id"] == "resp_previous"
+        x_search_tool = _tools_by_type(body)["x_search"]
+        assert len(x_search_tool["allowed_x_handles"]) == 10
+        assert "user9" in x_search_tool["allowed_x_handles"]
+        assert "user10" not in x_search_tool["allowed_x_handles"]
 
-    @respx.mock
-    def test_api_error_handling(self):
-        """Test handling of API errors."""
-        respx.post(API_ENDPOINT).mock(
-            return_value=Response(429, json={"error": "Rate limited"})
+    async def test_default_tools_not_mutated(self, mocked_route):
+        """Test that per-call options never leak into the shared tool defaults."""
+        await _create_request(
+            input_content="with options",
+            use_web_search=True,
+            use_x_search=True,
+            from_date="2025-01-01",
+            enable_image_understanding=True,
+        )
+        await _create_request(
+            input_content="without options",
+            use_web_search=True,
+            use_x_search=True,
+        )
+
+        body = _body(mocked_route, 1)
+        assert body["tools"] == [{"type": "web_search"}, {"type": "x_search"}]
+
+    async def test_streamed_response(self, mocked_route):
+        """Test that on_delta receives text deltas and the final response is parsed."""
+        events = [
+            {"type": "response.created", "response": {"id": "resp_sse", "status": "in_progress", "output": []}},
+            {"type": "response.output_text.delta", "delta": "Step one. "},
+            {"type": "response.output_text.delta", "delta": "Step two."},
+            {
+                "type": "response.completed",
+                "response": {
+                    "id": "resp_sse",
+                    "status": "completed",
+                    "output": [
+                        {
+                            "type": "message",
+                            "content": [{"type": "output_text", "text": "Step one. Step two."}]
+                        }
+                    ]
+                }
+            },
+        ]
+        stream = "".join(f"event: {e['type']}\ndata: {orjson.dumps(e).decode()}\n\n" for e in events)
+
+        mocked_route.mock(
+            return_value=Response(200, text=stream, headers={"Content-Type": "text/event-stream"})
         )
 
-        result = _create_request(input_content="test")
+        deltas = []
 
-        assert "error" in result
-        assert "429" in result["error"]
-        assert result["status"] == "failed"
+        async def on_delta(delta):
+            deltas.append(delta)
 
-    @respx.mock
-    def test_no_tools_for_chat(self):
-        """Test that no tools are included when both searches are disabled."""
-        mock_response = {"id": "resp_chat", "status": "completed", "output": []}
+        result = await _create_request(input_content="reason", use_reasoning=True, on_delta=on_delta)
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
+        assert b'"stream":true' in mocked_route.calls[0].request.content
+        assert deltas == ["Step one. ", "Step two."]
+        assert result.text == "Step one. Step two."
+        assert result.response_id == "resp_sse"
+        assert result.status == "completed"
 
-        _create_request(
-            input_content="just chat",
-            use_web_search=False,
-            use_x_search=False
+    async def test_streamed_response_without_final_event(self, mocked_route):
+        """Test that a stream cut off before its final event is marked incomplete."""
+        stream = (
+            'data: {"type": "response.created", "response": {"id": "resp_cut", "output": []}}\n\n'
+            'data: {"type": "response.output_text.delta", "delta": "Partial"}\n\n'
+            "data: [DONE]\n\n"
+        )
+        mocked_route.mock(
+            return_value=Response(200, text=stream, headers={"Content-Type": "text/event-stream"})
         )
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        async def on_delta(delta):
+            pass
 
-        assert "tools" not in body or body.get("tools") == []
+        result = await _create_request(input_content="reason", on_delta=on_delta)
 
-    @respx.mock
-    def test_max_handles_limit(self):
-        """Test that allowed_x_handles is limited to 10."""
-        mock_response = {"id": "resp_limit", "status": "completed", "output": []}
+        assert result.text == "Partial"
+        assert result.response_id == "resp_cut"
+        assert result.status == "incomplete"
+        assert "Response incomplete" in _format_response(result)
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
+    async def test_stream_interrupted_after_delta_not_retried(self, mocked_route):
+        """Test that a stream failing after a delta keeps it and is not re-sent."""
+        async def interrupted():
+            yield b'data: {"type": "response.created", "response": {"id": "resp_int"}}\n\n'
+            yield b'data: {"type": "response.output_text.delta", "delta": "Hello "}\n\n'
+            raise httpx.ReadTimeout("timed out")
 
-        handles = [f"user{i}" for i in range(15)]  # 15 handles
+        mocked_route.mock(side_effect=[
+            Response(200, content=interrupted(), headers={"Content-Type": "text/event-stream"}),
+        ])
+        deltas = []
 
-        _create_request(
-            input_content="test",
-            use_x_search=True,
-            allowed_x_handles=handles
-        )
+        async def on_delta(delta):
+            deltas.append(delta)
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        result = await _create_request(input_content="reason", on_delta=on_delta)
 
-        x_search_tool = next(t for t in body["tools"] if t["type"] == "x_search")
-        assert len(x_search_tool["allowed_x_handles"]) == 10
-        assert "user9" in x_search_tool["allowed_x_handles"]
-        assert "user10" not in x_search_tool["allowed_x_handles"]
+        assert mocked_route.call_count == 1
+        assert deltas == ["Hello "]
+        assert result.text == "Hello "
+        assert result.status == "incomplete"
 
-    @respx.mock
-    def test_both_searches_enabled(self):
-        """Test that both web and X search can be enabled together."""
-        mock_response = {"id": "resp_both", "status": "completed", "output": []}
+    async def test_stream_interrupted_before_delta_retried(self, mocked_route):
+        """Test that a stream failing before any delta is retried from scratch."""
+        async def interrupted():
+            yield b'data: {"type": "response.created", "response": {"id": "resp_int"}}\n\n'
+            raise httpx.ReadTimeout("timed out")
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
+        stream = (
+            'data: {"type": "response.output_text.delta", "delta": "Hello world"}\n\n'
+            'data: {"type": "response.completed", "response": {"id": "resp_ok", "status": "completed",'
+            ' "output_text": "Hello world"}}\n\n'
         )
-
-        _create_request(
-            input_content="search both",
-            use_web_search=True,
-            use_x_search=True
+        mocked_route.mock(side_effect=[
+            Response(200, content=interrupted(), headers={"Content-Type": "text/event-stream"}),
+            Response(200, text=stream, headers={"Content-Type": "text/event-stream"}),
+        ])
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        result = await _create_request(input_content="reason", on_delta=on_delta)
+
+        assert mocked_route.call_count == 2
+        assert deltas == ["Hello world"]
+        assert result.status == "completed"
+
+    @pytest.mark.parametrize(
+        "failure, error",
+        [
+            pytest.param(
+                '{"type": "response.failed", "response": {"id": "resp_f", "status": "failed",'
+                ' "error": {"code": "server_error", "message": "Model crashed"}}}',
+                "API error: server_error - Model crashed",
+                id="response_failed",
+            ),
+            pytest.param(
+                '{"type": "error", "code": "rate_limit_exceeded", "message": "Slow down"}',
+                "API error: rate_limit_exceeded - Slow down",
+                id="error_event",
+            ),
+        ],
+    )
+    async def test_streamed_failure(self, mocked_route, failure, error):
+        """Test that a failure reported mid-stream is returned as an error."""
+        stream = (
+            'data: {"type": "response.created", "response": {"id": "resp_f", "output": []}}\n\n'
+            f"data: {failure}\n\n"
+            "data: [DONE]\n\n"
+        )
+        mocked_route.mock(
+            return_value=Response(200, text=stream, headers={"Content-Type": "text/event-stream"})
         )
 
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
+        async def on_delta(delta):
+            pass
+
+        result = await _create_request(input_content="reason", on_delta=on_delta)
+
+        assert result.status == "failed"
+        assert result.error == error
+        assert mocked_route.call_count == 1
+
+    async def test_cached_response_skips_api(self, mocked_route, monkeypatch):
+        """Test that an identical request is served from the cache."""
+        cache = LLMCache(ttl=60)
+        monkeypatch.setattr(server, "_response_cache", lambda: cache)
+        first = await _create_request(input_content="same query")
+        second = await _create_request(input_content="same query")
+        await _create_request(input_content="other query")
+
+        assert mocked_route.call_count == 2
+        assert second == first
 
-        tool_types = [t["type"] for t in body["tools"]]
-        assert "web_search" in tool_types
-        assert "x_search" in tool_types
+    async def test_follow_up_turns_cached_per_conversation(self, mocked_route, monkeypatch):
+        """Test that a repeated follow-up on the same response_id hits the cache."""
+        cache = LLMCache(ttl=60)
+        monkeypatch.setattr(server, "_response_cache", lambda: cache)
+        await _create_request(input_content="and then?", previous_response_id="resp_a")
+        await _create_request(input_content="and then?", previous_response_id="resp_a")
+        await _create_request(input_content="and then?", previous_response_id="resp_b")
+        await _create_request(input_content="and then?")
+
+        assert mocked_route.call_count == 3
+
+    async def test_reasoning_and_errors_not_cached(self, mocked_route, monkeypatch):
+        """Test that reasoning requests and failed requests bypass the cache."""
+        cache = LLMCache(ttl=60)
+        monkeypatch.setattr(server, "_response_cache", lambda: cache)
+
+        await _create_request(input_content="think", use_reasoning=True)
+        await _create_request(input_content="think", use_reasoning=True)
+        assert mocked_route.call_count == 2
+
+        mocked_route.mock(return_value=Response(503, json={"error": "Unavailable"}))
+        await _create_request(input_content="flaky")
+        mocked_route.mock(return_value=Response(200, json={"id": "resp_ok", "output": []}))
+        result = await _create_request(input_content="flaky")
+        assert result.response_id == "resp_ok"
 
 
 class TestIntegration:
     """Integration tests using internal functions directly."""
 
-    @respx.mock
-    def test_search_flow(self):
+    @staticmethod
+    async def _run_flow(route, mock_response, **kwargs):
+        """Answer the next request with mock_response and format the result."""
+        route.mock(return_value=Response(200, json=mock_response))
+        result = await _create_request(**kwargs)
+        return _format_response(result)
+
+    async def test_search_flow(self, mocked_route):
         """Test the search flow end-to-end."""
         mock_response = {
             "id": "resp_search",
@@ -532,25 +810,20 @@ class TestIntegration:
             ]
         }
 
-        respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
         # Simulate what search tool does
-        result = _create_request(
+        formatted = await self._run_flow(
+            mocked_route,
+            mock_response,
             input_content="test query",
             system_instruction="Return search results.",
             max_tokens=4096,
             use_web_search=True,
         )
 
-        formatted = _format_response(result)
-
         assert "Search results." in formatted
         assert "[News](https://news.com)" in formatted
 
-    @respx.mock
-    def test_x_search_flow(self):
+    async def test_x_search_flow(self, mocked_route):
         """Test the X search flow end-to-end."""
         mock_response = {
             "id": "resp_xsearch",
@@ -567,12 +840,10 @@ class TestIntegration:
             ]
         }
 
-        respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
         # Simulate what x_search tool does
-        result = _create_request(
+        formatted = await self._run_flow(
+            mocked_route,
+            mock_response,
             input_content="test",
             max_tokens=4096,
             use_web_search=False,
@@ -581,13 +852,10 @@ class TestIntegration:
             from_date="2025-01-01"
         )
 
-        formatted = _format_response(result)
-
         assert "X posts." in formatted
         assert "[@user](https://x.com/u/status/1)" in formatted
 
-    @respx.mock
-    def test_x_ask_flow(self):
+    async def test_x_ask_flow(self, mocked_route):
         """Test the X ask flow end-to-end."""
         mock_response = {
             "id": "resp_xask",
@@ -600,12 +868,10 @@ class TestIntegration:
             ]
         }
 
-        respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
         # Simulate what x_ask tool does
-        result = _create_request(
+        formatted = await self._run_flow(
+            mocked_route,
+            mock_response,
             input_content="What are people saying?",
             max_tokens=8192,
             use_web_search=False,
@@ -614,13 +880,10 @@ class TestIntegration:
             enable_video_understanding=True
         )
 
-        formatted = _format_response(result)
-
         assert "Answer from X." in formatted
         assert "response_id: resp_xask" in formatted
 
-    @respx.mock
-    def test_think_flow(self):
+    async def test_think_flow(self, mocked_route):
         """Test the think flow with reasoning model."""
         mock_response = {
             "id": "resp_think",
@@ -633,11 +896,9 @@ class TestIntegration:
             ]
         }
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
-        result = _create_request(
+        formatted = await self._run_flow(
+            mocked_route,
+            mock_response,
             input_content="Analyze this",
             max_tokens=16384,
             use_web_search=True,
@@ -645,15 +906,10 @@ class TestIntegration:
         )
 
         # Verify reasoning model was used
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
-        assert body["model"] == "grok-4-1-fast"
-
-        formatted = _format_response(result)
+        assert b'"model":"grok-4-1-fast"' in mocked_route.calls[0].request.content
         assert "Deep analysis." in formatted
 
-    @respx.mock
-    def test_chat_flow_no_search(self):
+    async def test_chat_flow_no_search(self, mocked_route):
         """Test chat flow without any search."""
         mock_response = {
             "id": "resp_chat",
@@ -666,20 +922,105 @@ class TestIntegration:
             ]
         }
 
-        route = respx.post(API_ENDPOINT).mock(
-            return_value=Response(200, json=mock_response)
-        )
-
-        result = _create_request(
+        formatted = await self._run_flow(
+            mocked_route,
+            mock_response,
             input_content="Hello",
             use_web_search=False,
             use_x_search=False
         )
 
         # Verify no tools
-        request = route.calls[0].request
-        body = json.loads(request.content.decode())
-        assert "tools" not in body or body.get("tools") == []
-
-        formatted = _format_response(result)
+        assert b'"tools"' not in mocked_route.calls[0].request.content
         assert "Just chatting." in formatted
+
+    async def test_search_tools_instructions(self, mocked_route):
+        """Test that search tools fill max_results into their instructions."""
+        await search(query="web", max_results=5)
+        await x_search(query="posts", max_results=3)
+
+        web_body = _body(mocked_route)
+        x_body = _body(mocked_route, 1)
+        assert "Return up to 5 results." in web_body["input"][0]["content"]
+        assert "Return up to 3 results." in x_body["input"][0]["content"]
+        assert x_body["input"][0]["content"].startswith("Search X for the query")
+
+    async def test_tool_request_shapes(self, mocked_route):
+        """Test the fixed options each conversational tool sends."""
+        await ask(query="a", response_id="resp_prev")
+        await think(query="t")
+        await chat(query="c")
+        await x_ask(query="x", allowed_handles=["xai"])
+
+        ask_body, think_body, chat_body, x_ask_body = (
+            orjson.loads(call.request.content) for call in mocked_route.calls
+        )
+        assert ask_body["tools"] == [{"type": "web_search"}]
+        assert ask_body["previous_response_id"] == "resp_prev"
+        assert think_body["model"] == "grok-4-1-fast"
+        assert think_body["max_output_tokens"] == 16384
+        assert "tools" not in chat_body
+        assert chat_body["input"] == [{"role": "user", "content": "c"}]
+        assert x_ask_body["tools"] == [{"type": "x_search", "allowed_x_handles": ["xai"]}]
+
+    async def test_batch_ask_flow(self, mocked_route):
+        """Test that batch_ask answers every query in order."""
+        def respond(request):
+            query = orjson.loads(request.content)["input"][-1]["content"]
+            return Response(200, json={
+                "id": f"resp_{query}",
+                "status": "completed",
+                "output": [
+                    {
+                        "type": "message",
+                        "content": [{"type": "output_text", "text": f"Answer to {query}."}]
+                    }
+                ]
+            })
+
+        mocked_route.mock(side_effect=respond)
+
+        answers = await batch_ask(queries=["one", "two", "three"])
+
+        assert mocked_route.call_count == 3
+        assert len(answers) == 3
+        assert "Answer to one." in answers[0]
+        assert "Answer to two." in answers[1]
+        assert "Answer to three." in answers[2]
+
+    async def test_multi_search_flow(self, mocked_route):
+        """Test that multi_search answers every query under the concurrency cap."""
+        in_flight = 0
+        peak = 0
+
+        async def respond(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            body = orjson.loads(request.content)
+            return Response(200, json={
+                "id": "resp_multi",
+                "status": "completed",
+                "output": [
+                    {
+                        "type": "message",
+                        "content": [{"type": "output_text", "text": f"Results for {body['input'][-1]['content']}."}]
+                    }
+                ]
+            })
+
+        mocked_route.mock(side_effect=respond)
+
+        results = await multi_search(
+            queries=[f"q{i}" for i in range(5)],
+            max_results=3,
+            max_concurrency=2,
+        )
+
+        assert mocked_route.call_count == 5
+        assert peak == 2
+        assert all(f"Results for q{i}." in r for i, r in enumerate(results))
+        body = _body(mocked_route)
+        assert "Return up to 3 results." in body["input"][0]["content"]